@@ -0,0 +1,46 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+# All-pairs Hamming scan for find_near_duplicates.py. Not built automatically;
+# compile it once (drop -mpopcnt on non-x86 CPUs) with
+#   CFLAGS="-O3 -mpopcnt" cythonize -i scripts/_hamming.pyx
+from array import array
+
+from cpython cimport array as carray
+from cpython.mem cimport PyMem_Free, PyMem_Malloc, PyMem_Realloc
+from libc.stdint cimport int64_t, uint64_t
+from libc.string cimport memcpy
+
+cdef extern from *:
+    int __builtin_popcountll(unsigned long long x) nogil
+
+
+def find_pairs(const uint64_t[::1] H, const unsigned char[::1] valid, int thr):
+    """Return a flat array('q') [i0, j0, i1, j1, ...] of pairs i < j with popcount(H[i] ^ H[j]) <= thr."""
+    cdef Py_ssize_t n = H.shape[0]
+    cdef Py_ssize_t i, j, k = 0, cap = 1024
+    cdef uint64_t hi
+    cdef int64_t* grown
+    cdef int64_t* buf = <int64_t*>PyMem_Malloc(2 * cap * sizeof(int64_t))
+    cdef carray.array out
+    if buf == NULL:
+        raise MemoryError()
+    try:
+        for i in range(n):
+            if not valid[i]:
+                continue
+            hi = H[i]
+            for j in range(i + 1, n):
+                if valid[j] and __builtin_popcountll(hi ^ H[j]) <= thr:
+                    if k == cap:
+                        cap *= 2
+                        grown = <int64_t*>PyMem_Realloc(buf, 2 * cap * sizeof(int64_t))
+                        if grown == NULL:
+                            raise MemoryError()
+                        buf = grown
+                    buf[2 * k] = i
+                    buf[2 * k + 1] = j
+                    k += 1
+        out = carray.clone(array("q"), 2 * k, zero=False)
+        memcpy(out.data.as_voidptr, buf, 2 * k * sizeof(int64_t))
+        return out
+    finally:
+        PyMem_Free(buf)
@@ -0,0 +1,66 @@
+# Numba kernel for the all-pairs Hamming scan in find_near_duplicates.py.
+# Imported lazily, only when numba is installed.
+import numpy as np
+from numba import njit, prange
+
+M1 = np.uint64(0x5555555555555555)
+M2 = np.uint64(0x3333333333333333)
+M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+H01 = np.uint64(0x0101010101010101)
+
+
+@njit(inline="always", cache=True)
+def _popcount(x):
+    # SWAR popcount; LLVM recognizes the pattern and emits ctpop/popcnt
+    x = x - ((x >> np.uint64(1)) & M1)
+    x = (x & M2) + ((x >> np.uint64(2)) & M2)
+    x = (x + (x >> np.uint64(4))) & M4
+    return (x * H01) >> np.uint64(56)
+
+
+@njit(parallel=True, cache=True)
+def _count_pairs(H, valid, thr):
+    n = H.shape[0]
+    counts = np.zeros(n, dtype=np.int64)
+    for i in prange(n):
+        if not valid[i]:
+            continue
+        hi = H[i]
+        c = 0
+        for j in range(i + 1, n):
+            if valid[j] and _popcount(hi ^ H[j]) <= thr:
+                c += 1
+        counts[i] = c
+    return counts
+
+
+@njit(parallel=True, cache=True)
+def _fill_pairs(H, valid, thr, offsets, out_i, out_j):
+    n = H.shape[0]
+    for i in prange(n):
+        if not valid[i]:
+            continue
+        hi = H[i]
+        k = offsets[i]
+        for j in range(i + 1, n):
+            if valid[j] and _popcount(hi ^ H[j]) <= thr:
+                out_i[k] = i
+                out_j[k] = j
+                k += 1
+
+
+def find_pairs(H, valid, thr: int):
+    """Return (I, J) int64 arrays of all pairs i < j with popcount(H[i] ^ H[j]) <= thr.
+
+    Runs in two parallel passes: count hits per row, then write each row's
+    hits at its prefix-sum offset, so threads never share an output buffer.
+    """
+    thr = np.uint64(thr)
+    counts = _count_pairs(H, valid, thr)
+    offsets = np.zeros_like(counts)
+    np.cumsum(counts[:-1], out=offsets[1:])
+    total = int(counts.sum())
+    out_i = np.empty(total, dtype=np.int64)
+    out_j = np.empty(total, dtype=np.int64)
+    _fill_pairs(H, valid, thr, offsets, out_i, out_j)
+    return out_i, out_j
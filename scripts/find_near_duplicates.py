@@ -1,10 +1,18 @@
 #!/usr/bin/env python3
+import json
+import math
+import statistics
 import subprocess
 import sys
 import os
+import struct
 import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+from itertools import chain
 from pathlib import Path
-from typing import Dict, List, Tuple, Set
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Set, Union
 
 
 def have_pillow() -> bool:
@@ -15,61 +23,426 @@ def have_pillow() -> bool:
         return False
 
 
-def iter_image_paths(root: Path):
-    exts = {".jpg", ".jpeg"}
-    for p in root.rglob("*"):
-        if p.is_file() and p.suffix.lower() in exts:
-            yield p
+def have_wand() -> bool:
+    try:
+        import wand.image  # type: ignore
+        return True
+    except Exception:
+        return False
+
+
+def have_numpy() -> bool:
+    try:
+        import numpy  # type: ignore
+        return True
+    except Exception:
+        return False
 
 
-def ahash_pillow(path: Path) -> int:
+def have_numba() -> bool:
+    try:
+        import numba  # type: ignore
+        return True
+    except Exception:
+        return False
+
+
+def have_scipy() -> bool:
+    try:
+        import scipy.sparse.csgraph  # type: ignore
+        return True
+    except Exception:
+        return False
+
+
+def iter_image_paths(root: Path) -> Iterator[str]:
+    # os.scandir walk: DirEntry caches the file type, so no per-file stat or Path objects
+    exts = (".jpg", ".jpeg")
+    stack = [str(root)]
+    while stack:
+        d = stack.pop()
+        try:
+            it = os.scandir(d)
+        except OSError as e:
+            # Like rglob, skip directories that can't be listed (permissions, not a directory)
+            print(f"WARN: skipping {d}: {e}", file=sys.stderr)
+            continue
+        with it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    stack.append(e.path)
+                elif e.is_file() and e.name.lower().endswith(exts):
+                    yield e.path
+
+
+def gray_pillow(path: str, width: int, height: int) -> bytes:
     from PIL import Image  # type: ignore
     with Image.open(path) as im:
         im = im.convert("L")  # grayscale
-        im = im.resize((8, 8), Image.BILINEAR)
-        pixels = list(im.getdata())  # 64 values 0..255
-    avg = sum(pixels) / 64.0
-    bits = 0
-    for v in pixels:
-        bits = (bits << 1) | (1 if v > avg else 0)
-    return bits
-
-
-def ahash_imagemagick(path: Path) -> int:
-    # Use ImageMagick to emit 8x8 grayscale raw bytes, then compute average hash
+        im = im.resize((width, height), Image.BILINEAR)
+        return im.tobytes()  # width*height values 0..255, row-major
+
+
+def gray_wand(path: str, width: int, height: int) -> bytes:
+    # Same pipeline as the ImageMagick CLI fallback, but in-process via MagickWand
+    from wand.image import Image as WImage  # type: ignore
+    with WImage(filename=path) as im:
+        im.transform_colorspace("rgb")
+        im.resize(width, height)  # exact size, like "WxH!"
+        im.transform_colorspace("gray")
+        im.depth = 8
+        out = im.make_blob("gray")
+    if len(out) < width * height:
+        raise RuntimeError("unexpected gray output size")
+    return out[:width * height]
+
+
+def gray_imagemagick(path: str, width: int, height: int) -> bytes:
+    # Use ImageMagick to emit WxH grayscale raw bytes
     # Try `magick convert` first, then fallback to `convert`
+    size = f"{width}x{height}!"
     cmd_variants = [
-        ["magick", "convert", str(path), "-colorspace", "RGB", "-resize", "8x8!", "-colorspace", "Gray", "-depth", "8", "gray:-"],
-        ["convert", str(path), "-colorspace", "RGB", "-resize", "8x8!", "-colorspace", "Gray", "-depth", "8", "gray:-"],
+        ["magick", "convert", path, "-colorspace", "RGB", "-resize", size, "-colorspace", "Gray", "-depth", "8", "gray:-"],
+        ["convert", path, "-colorspace", "RGB", "-resize", size, "-colorspace", "Gray", "-depth", "8", "gray:-"],
     ]
     last_err = None
     for cmd in cmd_variants:
         try:
             out = subprocess.check_output(cmd, stderr=subprocess.DEVNULL)
-            if len(out) < 64:
+            if len(out) < width * height:
                 raise RuntimeError("unexpected gray output size")
-            pixels = out[:64]
-            avg = sum(pixels) / 64.0
-            bits = 0
-            for v in pixels:
-                bits = (bits << 1) | (1 if v > avg else 0)
-            return bits
+            return out[:width * height]
         except Exception as e:
             last_err = e
             continue
     raise RuntimeError(f"ImageMagick convert not available or failed: {last_err}")
 
 
-def ahash(path: Path) -> int:
+def gray_pixels(path: str, width: int, height: int) -> bytes:
     if have_pillow():
-        return ahash_pillow(path)
-    return ahash_imagemagick(path)
+        return gray_pillow(path, width, height)
+    if have_wand():
+        return gray_wand(path, width, height)
+    return gray_imagemagick(path, width, height)
+
+
+def ahash_bits(pixels: bytes) -> int:
+    # 64 grayscale bytes -> 64-bit hash, one bit per pixel brighter than the mean (MSB first)
+    if have_numpy():
+        import numpy as np  # type: ignore
+        a = np.frombuffer(pixels, dtype=np.uint8, count=64)
+        packed = np.packbits(a > a.sum() / 64.0)
+        return int.from_bytes(packed.tobytes(), "big")
+    avg = sum(pixels) / 64.0
+    bits = 0
+    for v in pixels:
+        bits = (bits << 1) | (1 if v > avg else 0)
+    return bits
+
+
+def dhash_bits(pixels: bytes) -> int:
+    # 9x8 grayscale bytes -> 64-bit hash, one bit per horizontal step that gets brighter
+    if have_numpy():
+        import numpy as np  # type: ignore
+        a = np.frombuffer(pixels, dtype=np.uint8, count=72).reshape(8, 9)
+        packed = np.packbits(a[:, 1:] > a[:, :-1])
+        return int.from_bytes(packed.tobytes(), "big")
+    bits = 0
+    for row in range(8):
+        r = pixels[row * 9:row * 9 + 9]
+        for x in range(8):
+            bits = (bits << 1) | (1 if r[x + 1] > r[x] else 0)
+    return bits
+
+
+@lru_cache(maxsize=None)
+def dct_basis(n: int = 32, k: int = 8) -> Tuple[Tuple[float, ...], ...]:
+    # First k rows of the (unnormalized) DCT-II matrix for n samples; built once per process
+    return tuple(tuple(math.cos(math.pi * (2 * x + 1) * u / (2 * n)) for x in range(n)) for u in range(k))
+
+
+@lru_cache(maxsize=None)
+def dct_basis_array(n: int = 32, k: int = 8):
+    import numpy as np  # type: ignore
+    C = np.array(dct_basis(n, k))
+    C.flags.writeable = False  # shared by every call
+    return C
+
+
+def phash_bits(pixels: bytes) -> int:
+    # 32x32 grayscale bytes -> 64-bit hash from the 8x8 lowest DCT frequencies vs their median
+    if have_numpy():
+        import numpy as np  # type: ignore
+        a = np.frombuffer(pixels, dtype=np.uint8, count=1024).reshape(32, 32).astype(np.float64)
+        Cn = dct_basis_array()
+        low = Cn @ a @ Cn.T
+        packed = np.packbits(low > np.median(low))
+        return int.from_bytes(packed.tobytes(), "big")
+    C = dct_basis()
+    rows = [pixels[y * 32:y * 32 + 32] for y in range(32)]
+    # low = C @ a @ C.T, via the 32x8 intermediate a @ C.T
+    t = [[sum(r[x] * cu[x] for x in range(32)) for cu in C] for r in rows]
+    low = [sum(C[u][y] * t[y][v] for y in range(32)) for u in range(8) for v in range(8)]
+    med = statistics.median(low)
+    bits = 0
+    for c in low:
+        bits = (bits << 1) | (1 if c > med else 0)
+    return bits
+
+
+def ahash(path: str) -> int:
+    return ahash_bits(gray_pixels(path, 8, 8))
+
+
+def dhash(path: str) -> int:
+    return dhash_bits(gray_pixels(path, 9, 8))
+
+
+def phash(path: str) -> int:
+    return phash_bits(gray_pixels(path, 32, 32))
+
+
+HASHERS = {"ahash": ahash, "dhash": dhash, "phash": phash}
+HASH_LABELS = {"ahash": "8x8 aHash", "dhash": "9x8 dHash", "phash": "32x32 DCT pHash"}
+
+
+def _safe_hash(algo: str, path: str) -> Tuple[int, Optional[str]]:
+    # Worker entry point: errors come back as values so one bad file doesn't abort the pool
+    try:
+        return HASHERS[algo](path), None
+    except Exception as e:
+        return -1, str(e)
+
+
+# Hash cache: magic, hash algorithm, record count, then per file
+# (path length, path bytes in the filesystem encoding, mtime_ns, size, hash), all little-endian.
+CACHE_MAGIC = b"NDH2"
+CACHE_HEADER = struct.Struct("<8sI")
+CACHE_RECORD = struct.Struct("<qqQ")
+
+
+def load_hash_cache(path: Path, algo: str) -> Dict[str, Tuple[int, int, int]]:
+    """Read {path: (mtime_ns, size, hash)} from `path`; a missing, unreadable or other-algorithm cache is empty."""
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return {}
+    except OSError as e:
+        print(f"WARN: ignoring hash cache {path}: {e}", file=sys.stderr)
+        return {}
+    entries: Dict[str, Tuple[int, int, int]] = {}
+    try:
+        if data[:4] != CACHE_MAGIC:
+            raise ValueError("unrecognized header")
+        cached_algo, count = CACHE_HEADER.unpack_from(data, 4)
+        if cached_algo.rstrip(b"\0").decode("ascii") != algo:
+            return {}  # built with another --hash; those hashes aren't comparable
+        off = 4 + CACHE_HEADER.size
+        for _ in range(count):
+            (plen,) = struct.unpack_from("<H", data, off)
+            off += 2
+            key = os.fsdecode(data[off:off + plen])  # round-trips non-UTF-8 names
+            off += plen
+            entries[key] = CACHE_RECORD.unpack_from(data, off)
+            off += CACHE_RECORD.size
+    except (ValueError, struct.error) as e:  # includes UnicodeDecodeError
+        print(f"WARN: ignoring hash cache {path}: {e}", file=sys.stderr)
+        return {}
+    return entries
+
+
+def save_hash_cache(path: Path, algo: str, entries: Dict[str, Tuple[int, int, int]]):
+    """Write the cache atomically; failures only warn so the run's results are kept."""
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        parts = [CACHE_MAGIC, CACHE_HEADER.pack(algo.encode("ascii"), len(entries))]
+        for key, rec in entries.items():
+            raw = os.fsencode(key)  # scandir surrogate-escapes non-UTF-8 names
+            parts.append(struct.pack("<H", len(raw)))
+            parts.append(raw)
+            parts.append(CACHE_RECORD.pack(*rec))
+        tmp.write_bytes(b"".join(parts))
+        os.replace(tmp, path)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"WARN: could not write hash cache {path}: {e}", file=sys.stderr)
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
 
 
 def hamming(a: int, b: int) -> int:
     return (a ^ b).bit_count()
 
 
+def have_simd_popcount() -> bool:
+    # np.bitwise_count (NumPy >= 2.0) lowers to popcnt / AVX-512 VPOPCNTQ where available
+    try:
+        import numpy as np  # type: ignore
+        return hasattr(np, "bitwise_count")
+    except Exception:
+        return False
+
+
+def pack_hashes(hashes: List[int]):
+    """Pack hashes into a uint64 array plus a validity mask; failed hashes (-1) become 0 / False."""
+    import numpy as np  # type: ignore
+    n = len(hashes)
+    H = np.fromiter((h & 0xFFFFFFFFFFFFFFFF if h >= 0 else 0 for h in hashes), dtype=np.uint64, count=n)
+    valid = np.fromiter((h >= 0 for h in hashes), dtype=bool, count=n)
+    return H, valid
+
+
+def popcount64(x):
+    # Per-element popcount of a uint64 array; np.bitwise_count needs NumPy >= 2.0
+    import numpy as np  # type: ignore
+    if have_simd_popcount():
+        return np.bitwise_count(x)
+    bits = np.unpackbits(np.ascontiguousarray(x).view(np.uint8))
+    return bits.reshape(x.shape + (64,)).sum(axis=-1)
+
+
+def similar_pairs_python(hashes: List[int], thr: int) -> Iterator[Tuple[int, int]]:
+    n = len(hashes)
+    for i in range(n):
+        hi = hashes[i]
+        if hi < 0:
+            continue
+        for j in range(i + 1, n):
+            hj = hashes[j]
+            if hj < 0:
+                continue
+            if hamming(hi, hj) <= thr:
+                yield i, j
+
+
+# Index pairs (i < j): either an iterator of tuples, or from the array
+# backends an (I, J) pair of int64 arrays that goes straight to SciPy
+Pairs = Union[Iterable[Tuple[int, int]], Tuple[Any, Any]]
+
+# Cap on distance-matrix cells computed per block (8 MiB of uint64 XORs)
+PAIR_BLOCK_CELLS = 1 << 20
+
+
+def similar_pairs_numpy(hashes: List[int], thr: int) -> Tuple[Any, Any]:
+    import numpy as np  # type: ignore
+    n = len(hashes)
+    H, valid = pack_hashes(hashes)
+    Is, Js = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    start = 0
+    while start < n:
+        stop = min(n, start + max(1, PAIR_BLOCK_CELLS // (n - start)))
+        # Distances from a block of rows to every hash at or after the block, in one sweep
+        d = popcount64(H[start:stop, None] ^ H[None, start:])
+        hit = (d <= thr) & valid[start:stop, None] & valid[None, start:]
+        rows, cols = np.nonzero(np.triu(hit, k=1))  # keep j > i only
+        Is.append(rows + start)
+        Js.append(cols + start)
+        start = stop
+    return np.concatenate(Is), np.concatenate(Js)
+
+
+def hamming_ext():
+    # Compiled scan from scripts/_hamming.pyx, only if it was built beforehand (see its header)
+    try:
+        import _hamming  # type: ignore
+        return _hamming
+    except ImportError:
+        return None
+
+
+def similar_pairs_cython(ext, hashes: List[int], thr: int) -> Pairs:
+    H = array("Q", (h if h >= 0 else 0 for h in hashes))
+    valid = array("B", (h >= 0 for h in hashes))
+    flat = ext.find_pairs(H, valid, thr)  # array('q') i0, j0, i1, j1, ...
+    if have_numpy():
+        import numpy as np  # type: ignore
+        E = np.frombuffer(flat, dtype=np.int64)  # zero-copy view
+        return E[0::2], E[1::2]
+    it = iter(flat)
+    return zip(it, it)
+
+
+def similar_pairs_numba(hashes: List[int], thr: int) -> Tuple[Any, Any]:
+    # Compiled parallel scan (scripts/_hamming_numba.py); pairs come back as (I, J) arrays
+    from _hamming_numba import find_pairs  # type: ignore
+    H, valid = pack_hashes(hashes)
+    return find_pairs(H, valid, thr)
+
+
+# Multi-index hashing splits the hash into thr+1 chunks; above these the
+# chunks get narrow enough that bucket-mates outnumber what a full scan checks
+# in the same time. Measured on one CPU with 100k clustered hashes: vs Numba
+# or NumPy, thr=5 is 8.0 s vs 10.6 s for Numba; vs the Cython kernel, thr=4 is
+# 2.1 s vs 3.4 s but thr=5 is 8.0 s vs 3.5 s.
+MIH_MAX_THRESHOLD = 5
+MIH_MAX_THRESHOLD_COMPILED = 4
+# Numba JIT-compiles on its first run (~2 s, cached on disk afterwards); below
+# this many hashes the NumPy block scan is done first (1.15 s at 20k).
+NUMBA_MIN_HASHES = 30_000
+# The Numba kernel scans twice (count, then fill) and costs ~3x the serial
+# Cython loop per core (10.6 s vs 3.5 s at 100k), so it needs this many CPUs to win.
+NUMBA_MIN_CPUS = 4
+
+
+def chunk_spans(m: int) -> List[Tuple[int, int]]:
+    # Split 64 bits into m contiguous (shift, mask) chunks of near-equal width
+    spans = []
+    shift = 0
+    for k in range(m):
+        width = 64 // m + (1 if k < 64 % m else 0)
+        spans.append((shift, (1 << width) - 1))
+        shift += width
+    return spans
+
+
+def similar_pairs_mih(hashes: List[int], thr: int) -> Iterator[Tuple[int, int]]:
+    # Pigeonhole: if two hashes differ in <= thr bits, at least one of thr+1
+    # disjoint chunks is identical, so only bucket-mates need a full check.
+    spans = chunk_spans(thr + 1)
+    tables: List[Dict[int, List[int]]] = [{} for _ in spans]
+    for i, h in enumerate(hashes):
+        if h < 0:
+            continue
+        for (shift, mask), table in zip(spans, tables):
+            table.setdefault((h >> shift) & mask, []).append(i)
+
+    for i, hi in enumerate(hashes):
+        if hi < 0:
+            continue
+        cands: Set[int] = set()
+        for (shift, mask), table in zip(spans, tables):
+            cands.update(j for j in table[(hi >> shift) & mask] if j > i)
+        for j in sorted(cands):
+            if hamming(hi, hashes[j]) <= thr:
+                yield i, j
+
+
+def similar_pairs(hashes: List[int], thr: int, force_numpy: bool = False) -> Pairs:
+    """Index pairs (i < j) whose hashes are within `thr` bits; failed hashes (-1) are skipped.
+
+    `force_numpy` skips every other backend and always runs the np.bitwise_count block scan.
+    """
+    if force_numpy:
+        return similar_pairs_numpy(hashes, thr)
+    # Compiled kernels are O(N^2); MIH stays near-linear at small thresholds
+    ext = hamming_ext()
+    many_cpus = (os.cpu_count() or 1) >= NUMBA_MIN_CPUS
+    if len(hashes) >= NUMBA_MIN_HASHES and (ext is None or many_cpus) and have_numba():
+        if thr <= (MIH_MAX_THRESHOLD_COMPILED if many_cpus else MIH_MAX_THRESHOLD):
+            return similar_pairs_mih(hashes, thr)
+        return similar_pairs_numba(hashes, thr)
+    if ext is not None:
+        if thr <= MIH_MAX_THRESHOLD_COMPILED:
+            return similar_pairs_mih(hashes, thr)
+        return similar_pairs_cython(ext, hashes, thr)
+    if thr <= MIH_MAX_THRESHOLD:
+        return similar_pairs_mih(hashes, thr)
+    if have_numpy():
+        return similar_pairs_numpy(hashes, thr)
+    return similar_pairs_python(hashes, thr)
+
+
 class DSU:
     def __init__(self, n: int):
         self.p = list(range(n))
@@ -92,6 +465,64 @@ class DSU:
             self.r[ra] += 1
 
 
+def exact_hash_groups(hashes: List[int]) -> List[List[int]]:
+    # Threshold 0 means equal hashes: bucket by value in O(N), no pairs or union-find needed
+    buckets: Dict[int, List[int]] = {}
+    for i, h in enumerate(hashes):
+        if h >= 0:
+            buckets.setdefault(h, []).append(i)
+    return [idxs for idxs in buckets.values() if len(idxs) > 1]
+
+
+def connected_groups_dsu(n: int, pairs: Iterable[Tuple[int, int]]) -> List[List[int]]:
+    dsu = DSU(n)
+    for i, j in pairs:
+        dsu.union(i, j)
+    comps: Dict[int, List[int]] = {}
+    for idx in range(n):
+        comps.setdefault(dsu.find(idx), []).append(idx)
+    return [idxs for idxs in comps.values() if len(idxs) > 1]
+
+
+def connected_groups_scipy(n: int, I, J) -> List[List[int]]:
+    import numpy as np  # type: ignore
+    from scipy.sparse import coo_matrix  # type: ignore
+    from scipy.sparse.csgraph import connected_components  # type: ignore
+    g = coo_matrix((np.ones(len(I), dtype=bool), (I, J)), shape=(n, n))
+    _, labels = connected_components(g, directed=False)
+    order = np.argsort(labels, kind="stable")
+    bounds = np.flatnonzero(np.diff(labels[order])) + 1
+    return [idxs.tolist() for idxs in np.split(order, bounds) if len(idxs) > 1]
+
+
+def connected_groups(n: int, pairs: Pairs) -> List[List[int]]:
+    """Connected components with >= 2 members of the graph on range(n) with edges `pairs`."""
+    arrays = isinstance(pairs, tuple)
+    if have_scipy():
+        if not arrays:
+            import numpy as np  # type: ignore
+            edges = np.fromiter(chain.from_iterable(pairs), dtype=np.int64).reshape(-1, 2)
+            pairs = (edges[:, 0], edges[:, 1])
+        return connected_groups_scipy(n, *pairs)
+    if arrays:
+        pairs = zip(pairs[0].tolist(), pairs[1].tolist())
+    return connected_groups_dsu(n, pairs)
+
+
+def _try_remove(path: str) -> Optional[str]:
+    try:
+        os.remove(path)
+        return None
+    except Exception as e:
+        return str(e)
+
+
+def remove_files(paths: List[str], workers: int = 16) -> Dict[str, Optional[str]]:
+    """Delete `paths` concurrently; map each path to None on success or its error message."""
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        return dict(zip(paths, ex.map(_try_remove, paths)))
+
+
 def mode_to_threshold(mode: str) -> int:
     mode = (mode or "").lower()
     if mode in ("conservative", "c"):
@@ -102,104 +533,156 @@ def mode_to_threshold(mode: str) -> int:
     return 10
 
 
+def review_error(review) -> Optional[str]:
+    """Describe what is wrong with a loaded review manifest, or None if it is usable."""
+    if not isinstance(review, dict):
+        return "top level is not an object"
+    meta = review.get("meta")
+    if not isinstance(meta, dict) or "mode" not in meta or "threshold" not in meta:
+        return "missing meta.mode / meta.threshold"
+    groups = review.get("groups")
+    if not isinstance(groups, list):
+        return "missing groups list"
+    # Every path may appear once across all groups: a dupe that is also some
+    # group's keep (or is listed twice) could otherwise delete the last copy
+    seen: Dict[str, int] = {}
+    for gi, g in enumerate(groups, 1):
+        if not isinstance(g, dict) or not isinstance(g.get("keep"), str):
+            return f"group {gi} has no keep path"
+        dupes = g.get("dupes")
+        if not isinstance(dupes, list) or not all(isinstance(d, str) for d in dupes):
+            return f"group {gi} dupes is not a list of paths"
+        for path in [g["keep"]] + dupes:
+            if path in seen:
+                return f"{path} appears in group {seen[path]} and again in group {gi}"
+            seen[path] = gi
+    return None
+
+
+# Minimum seconds between progress lines
+PROGRESS_INTERVAL = 1.0
+
+
+def scan(root: Path, algo: str, thr: int, cache_path: Optional[Path], force_numpy: bool = False) -> Tuple[List[List[str]], List[Tuple[str, str]]]:
+    """Hash every image under `root` and return (sorted path groups, hash failures)."""
+    files = sorted(iter_image_paths(root))
+    cache = load_hash_cache(cache_path, algo) if cache_path else {}
+
+    hashes: List[int] = [-1] * len(files)
+    stats: List[Optional[Tuple[int, int]]] = []
+    todo: List[int] = []
+    for idx, p in enumerate(files):
+        try:
+            st = os.stat(p)
+            stats.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stats.append(None)
+        hit = cache.get(p)
+        if hit is not None and stats[idx] == hit[:2]:
+            hashes[idx] = hit[2]
+        else:
+            todo.append(idx)
+
+    cached = len(files) - len(todo)
+    print(f"Hashing {len(todo)} image(s) with {HASH_LABELS[algo]}" + (f" ({cached} cached)" if cached else "") + "…", flush=True)
+
+    failures: List[Tuple[str, str]] = []
+    workers = os.cpu_count() or 1
+    chunksize = max(1, min(32, len(todo) // (workers * 4)))
+    last_report = 0.0
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        results = ex.map(partial(_safe_hash, algo), [files[idx] for idx in todo], chunksize=chunksize)
+        for i, (idx, (h, err)) in enumerate(zip(todo, results), 1):
+            hashes[idx] = h
+            if err is not None:
+                failures.append((files[idx], err))
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL or i == len(todo):
+                print(f"  Hashed {i}/{len(todo)}", flush=True)
+                last_report = now
+
+    if cache_path:
+        save_hash_cache(cache_path, algo, {
+            p: (*st, h) for p, st, h in zip(files, stats, hashes) if st is not None and h >= 0
+        })
+
+    # Build similarity graph using threshold
+    print(f"Comparing hashes (threshold={thr})…", flush=True)
+    if thr == 0:
+        comps = exact_hash_groups(hashes)
+    else:
+        # Failed hashes (-1) never appear in a pair, so they stay singletons
+        comps = connected_groups(len(files), similar_pairs(hashes, thr, force_numpy))
+    # Propose keeping the lexicographically first path of each group
+    groups = [sorted(files[i] for i in idxs) for idxs in comps]
+    groups.sort(key=lambda g: (len(g), g))
+    return groups, failures
+
+
 def main(argv: List[str]) -> int:
     import argparse
 
-    ap = argparse.ArgumentParser(description="Find near-duplicate JPEGs using average perceptual hash (8x8)")
+    ap = argparse.ArgumentParser(description="Find near-duplicate JPEGs using a 64-bit perceptual hash")
     ap.add_argument("--root", default="images", help="Root folder to scan (default: images)")
+    ap.add_argument("--hash", choices=sorted(HASHERS), default="ahash", help="Perceptual hash: average, gradient (dHash) or DCT (pHash)")
     ap.add_argument("--mode", choices=["conservative", "medium", "aggressive"], default="medium", help="Similarity mode")
     ap.add_argument("--threshold", type=int, default=None, help="Override Hamming threshold (0-64)")
     ap.add_argument("--delete", action="store_true", help="Delete proposed near-duplicates (use with --yes)")
     ap.add_argument("--yes", action="store_true", help="Confirm deletion when --delete is set")
+    ap.add_argument("--require-numpy2", action="store_true", help="Always compare with the NumPy np.bitwise_count scan, failing if NumPy < 2.0 (threshold 0 still groups equal hashes directly)")
+    ap.add_argument("--cache", default=None, help="Hash cache file; unchanged files (same mtime and size) are not re-decoded")
+    ap.add_argument("--from-manifest", default=None, help="Reuse groups from a previous JSON review manifest instead of rescanning")
     args = ap.parse_args(argv)
 
-    root = Path(args.root)
-    if not root.exists():
-        print(f"Root not found: {root}", file=sys.stderr)
-        return 2
-
-    thr = args.threshold if args.threshold is not None else mode_to_threshold(args.mode)
-    if thr < 0 or thr > 64:
-        print("Threshold must be between 0 and 64", file=sys.stderr)
-        return 2
-
-    files = sorted(iter_image_paths(root), key=lambda p: str(p))
-    print(f"Hashing {len(files)} image(s) with 8x8 aHash…", flush=True)
-
-    hashes: List[int] = []
-    failures: List[Tuple[Path, str]] = []
-    for i, p in enumerate(files, 1):
-        try:
-            h = ahash(p)
-            hashes.append(h)
-        except Exception as e:
-            hashes.append(-1)
-            failures.append((p, str(e)))
-        if i % 50 == 0 or i == len(files):
-            print(f"  Hashed {i}/{len(files)}", flush=True)
-
-    # Build similarity graph using threshold
-    print(f"Comparing hashes (threshold={thr})…", flush=True)
-    n = len(files)
-    dsu = DSU(n)
-    pairs = 0
-    for i in range(n):
-        hi = hashes[i]
-        if hi < 0:
-            continue
-        for j in range(i + 1, n):
-            hj = hashes[j]
-            if hj < 0:
-                continue
-            if hamming(hi, hj) <= thr:
-                dsu.union(i, j)
-                pairs += 1
-
-    # Collect components
-    comps: Dict[int, List[int]] = {}
-    for idx in range(n):
-        if hashes[idx] < 0:
-            continue
-        root_idx = dsu.find(idx)
-        comps.setdefault(root_idx, []).append(idx)
-
-    groups = [sorted(idxs) for idxs in comps.values() if len(idxs) > 1]
-    groups.sort(key=lambda g: (len(g), [str(files[i]) for i in g]))
-
     ts = time.strftime("%Y%m%d-%H%M%S")
-    review_manifest = Path(f"near-duplicate-review-{ts}.txt")
     removed_manifest = Path(f"near-duplicate-removals-{ts}.txt")
 
-    kept_total = 0
-    delete_total = 0
-    with review_manifest.open("w", encoding="utf-8") as mf:
-        mf.write("Near-duplicate review manifest (8x8 aHash)\n")
-        mf.write(time.strftime("Generated: %Y-%m-%d %H:%M:%S") + "\n")
-        mf.write(f"Mode: {args.mode}  Threshold: {thr}\n")
-        if failures:
-            mf.write(f"Hash failures: {len(failures)}\n")
-            for p, err in failures[:10]:
-                mf.write(f"  FAIL {p}: {err}\n")
-            if len(failures) > 10:
-                mf.write(f"  … {len(failures) - 10} more failures omitted\n")
-        mf.write("\n")
-
-        for gi, group in enumerate(groups, 1):
-            paths = [files[i] for i in group]
-            # Propose keeping lexicographically first path
-            paths_sorted = sorted(paths, key=lambda p: str(p))
-            keep = paths_sorted[0]
-            dupes = paths_sorted[1:]
-            kept_total += 1
-            delete_total += len(dupes)
-            mf.write(f"Group {gi} (size={len(paths)}):\n")
-            mf.write(f"  KEEP: {keep}\n")
-            for d in dupes:
-                mf.write(f"  DEL?: {d}\n")
-            mf.write("\n")
-
-    print(f"Groups found: {len(groups)}")
-    print(f"Proposed deletions: {delete_total} (keeping {kept_total})")
+    if args.from_manifest:
+        review_manifest = Path(args.from_manifest)
+        try:
+            with review_manifest.open("r", encoding="utf-8", errors="surrogateescape") as mf:
+                review = json.load(mf)
+        except (OSError, ValueError) as e:
+            print(f"Cannot read manifest {review_manifest}: {e}", file=sys.stderr)
+            return 2
+        err = review_error(review)
+        if err is not None:
+            print(f"Invalid manifest {review_manifest}: {err}", file=sys.stderr)
+            return 2
+    else:
+        root = Path(args.root)
+        if not root.exists():
+            print(f"Root not found: {root}", file=sys.stderr)
+            return 2
+
+        thr = args.threshold if args.threshold is not None else mode_to_threshold(args.mode)
+        if thr < 0 or thr > 64:
+            print("Threshold must be between 0 and 64", file=sys.stderr)
+            return 2
+        if args.require_numpy2 and not have_simd_popcount():
+            print("--require-numpy2: NumPy >= 2.0 with np.bitwise_count is not available", file=sys.stderr)
+            return 2
+
+        groups, failures = scan(root, args.hash, thr, Path(args.cache) if args.cache else None, args.require_numpy2)
+        review = {
+            "meta": {
+                "generated": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "hash": args.hash,
+                "mode": args.mode,
+                "threshold": thr,
+                "root": str(root),
+                "failures": [{"path": p, "error": err} for p, err in failures],
+            },
+            "groups": [{"keep": g[0], "dupes": g[1:]} for g in groups],
+        }
+        review_manifest = Path(f"near-duplicate-review-{ts}.json")
+        with review_manifest.open("w", encoding="utf-8", errors="surrogateescape") as mf:
+            json.dump(review, mf, ensure_ascii=False, indent=2)
+
+    meta = review["meta"]
+    plan = [[g["keep"]] + g["dupes"] for g in review["groups"]]
+    print(f"Groups found: {len(plan)}")
+    print(f"Proposed deletions: {sum(len(g) - 1 for g in plan)} (keeping {len(plan)})")
     print(f"Review manifest: {review_manifest}")
 
     if args.delete:
@@ -207,26 +690,32 @@ def main(argv: List[str]) -> int:
             print("--delete specified without --yes; skipping deletion.")
             return 0
         removed = 0
-        with removed_manifest.open("w", encoding="utf-8") as rm:
-            rm.write("Near-duplicate removals (executed)\n")
-            rm.write(time.strftime("Generated: %Y-%m-%d %H:%M:%S") + "\n")
-            rm.write(f"Mode: {args.mode}  Threshold: {thr}\n\n")
-            for gi, group in enumerate(groups, 1):
-                paths = [files[i] for i in group]
-                paths_sorted = sorted(paths, key=lambda p: str(p))
-                keep = paths_sorted[0]
-                dupes = paths_sorted[1:]
-                rm.write(f"Group {gi} (size={len(paths)}):\n")
-                rm.write(f"  KEEP: {keep}\n")
-                for d in dupes:
-                    try:
-                        os.remove(d)
-                        removed += 1
-                        rm.write(f"  DEL : {d}\n")
-                    except Exception as e:
-                        rm.write(f"  FAIL: {d} ({e})\n")
-                rm.write("\n")
+        # A loaded manifest may be stale: never delete dupes once their kept copy is gone
+        keep_ok = [os.path.isfile(paths_sorted[0]) for paths_sorted in plan]
+        errors = remove_files([d for paths_sorted, ok in zip(plan, keep_ok) if ok for d in paths_sorted[1:]])
+        lines = [
+            "Near-duplicate removals (executed)\n",
+            time.strftime("Generated: %Y-%m-%d %H:%M:%S") + "\n",
+            f"Mode: {meta['mode']}  Threshold: {meta['threshold']}\n\n",
+        ]
+        for gi, (paths_sorted, ok) in enumerate(zip(plan, keep_ok), 1):
+            lines.append(f"Group {gi} (size={len(paths_sorted)}):\n")
+            if not ok:
+                lines.append(f"  FAIL: {paths_sorted[0]} (kept file missing; group skipped)\n\n")
+                continue
+            lines.append(f"  KEEP: {paths_sorted[0]}\n")
+            for d in paths_sorted[1:]:
+                if errors[d] is None:
+                    removed += 1
+                    lines.append(f"  DEL : {d}\n")
+                else:
+                    lines.append(f"  FAIL: {d} ({errors[d]})\n")
+            lines.append("\n")
+        with removed_manifest.open("w", encoding="utf-8", errors="surrogateescape") as rm:
+            rm.write("".join(lines))
         print(f"Deleted near-duplicates: {removed}")
+        if not all(keep_ok):
+            print(f"Skipped groups (kept file missing): {keep_ok.count(False)}")
         print(f"Removal manifest: {removed_manifest}")
 
     return 0
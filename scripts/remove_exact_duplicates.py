@@ -3,27 +3,109 @@ import hashlib
 import os
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
 from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
 
+T = TypeVar("T")
 
-def iter_image_paths(root: Path):
-    exts = {".jpg", ".jpeg"}
-    for p in root.rglob("*"):
-        if not p.is_file():
+# Minimum seconds between progress lines
+PROGRESS_INTERVAL = 1.0
+
+
+def have_blake3() -> bool:
+    try:
+        import blake3  # type: ignore
+        return True
+    except Exception:
+        return False
+
+
+def iter_image_paths(root: Path) -> Iterator[str]:
+    # os.scandir walk: DirEntry caches the file type, so no per-file stat or Path objects
+    exts = (".jpg", ".jpeg")
+    stack = [str(root)]
+    while stack:
+        d = stack.pop()
+        try:
+            it = os.scandir(d)
+        except OSError as e:
+            # Like rglob, skip directories that can't be listed (permissions, not a directory)
+            print(f"WARN: skipping {d}: {e}", file=sys.stderr)
             continue
-        if p.suffix.lower() in exts:
-            yield p
+        with it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    stack.append(e.path)
+                elif e.is_file() and e.name.lower().endswith(exts):
+                    yield e.path
+
+
+def sha256_file(path: str, bufsize: int = 8 * 1024 * 1024) -> str:
+    # Unbuffered: the digest consumes whole chunks, so a BufferedReader would only add a copy
+    with open(path, "rb", buffering=0) as f:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)  # widen kernel readahead
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        # Older Pythons: read into one reused buffer instead of allocating per chunk
+        h = hashlib.sha256()
+        buf = bytearray(bufsize)
+        view = memoryview(buf)
+        while n := f.readinto(buf):
+            h.update(view[:n])
+        return h.hexdigest()
+
+
+def blake3_file(path: str) -> str:
+    # Memory-maps the file and lets blake3 spread the tree hash across threads
+    from blake3 import blake3  # type: ignore
+    return blake3(max_threads=blake3.AUTO).update_mmap(path).hexdigest()
+
+
+def digest_name() -> str:
+    return "BLAKE3" if have_blake3() else "SHA-256"
+
+
+def file_fingerprint(path: str) -> str:
+    # Only a content fingerprint is needed, so use the faster hash when installed
+    if have_blake3():
+        return blake3_file(path)
+    return sha256_file(path)
+
 
+def quick_fingerprint(path: str, span: int = 4096) -> Tuple[int, bytes]:
+    # Size plus a digest of the first and last `span` bytes: cheap, and enough
+    # to tell most same-size JPEGs apart (headers and quant tables differ early)
+    st = os.stat(path)
+    with open(path, "rb") as f:
+        head = f.read(span)
+        f.seek(max(0, st.st_size - span))
+        tail = f.read(span)
+    return st.st_size, hashlib.blake2b(head + tail, digest_size=16).digest()
 
-def sha256_file(path: Path, bufsize: int = 1024 * 1024) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as f:
-        while True:
-            chunk = f.read(bufsize)
-            if not chunk:
-                break
-            h.update(chunk)
-    return h.hexdigest()
+
+def _safe_hash(fn: Callable[[str], T], path: str) -> Tuple[Optional[T], Optional[str]]:
+    # Hashing is I/O bound and releases the GIL, so threads are enough
+    try:
+        return fn(path), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _try_remove(path: str) -> Optional[str]:
+    try:
+        os.remove(path)
+        return None
+    except Exception as e:
+        return str(e)
+
+
+def remove_files(paths: List[str], workers: int = 16) -> Dict[str, Optional[str]]:
+    """Delete `paths` concurrently; map each path to None on success or its error message."""
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        return dict(zip(paths, ex.map(_try_remove, paths)))
 
 
 def main():
@@ -33,48 +115,76 @@ def main():
         sys.exit(1)
 
     # Hash files and group by digest
-    digest_map: dict[str, list[Path]] = {}
+    digest_map: dict[str, list[str]] = {}
     files = sorted(iter_image_paths(images_root))
     total = len(files)
     print(f"Scanning {total} image(s) for exact duplicates…", flush=True)
 
-    for i, p in enumerate(files, 1):
+    # Files of different sizes can't be identical; only hash sizes seen more than once
+    size_map: dict[int, list[str]] = {}
+    for p in files:
         try:
-            digest = sha256_file(p)
-        except Exception as e:
-            print(f"WARN: failed to hash {p}: {e}", file=sys.stderr)
-            continue
-        digest_map.setdefault(digest, []).append(p)
-        if i % 50 == 0 or i == total:
-            print(f"  Hashed {i}/{total}", flush=True)
+            size_map.setdefault(os.stat(p).st_size, []).append(p)
+        except OSError as e:
+            print(f"WARN: failed to stat {p}: {e}", file=sys.stderr)
+    candidates = sorted(p for paths in size_map.values() if len(paths) > 1 for p in paths)
+    print(f"  {len(candidates)} image(s) share a file size with another", flush=True)
+
+    with ThreadPoolExecutor() as ex:
+        # Pre-digest head+tail bytes; only files that still collide get a full hash
+        quick_map: dict[Tuple[int, bytes], list[str]] = {}
+        for p, (key, err) in zip(candidates, ex.map(_safe_hash, repeat(quick_fingerprint), candidates)):
+            if err is not None:
+                print(f"WARN: failed to read {p}: {err}", file=sys.stderr)
+                continue
+            quick_map.setdefault(key, []).append(p)
+        colliding = sorted(p for paths in quick_map.values() if len(paths) > 1 for p in paths)
+        total = len(colliding)
+        print(f"  {total} image(s) also match another on head/tail bytes", flush=True)
+
+        last_report = 0.0
+        for i, (p, (digest, err)) in enumerate(zip(colliding, ex.map(_safe_hash, repeat(file_fingerprint), colliding)), 1):
+            if err is not None:
+                print(f"WARN: failed to hash {p}: {err}", file=sys.stderr)
+                continue
+            digest_map.setdefault(digest, []).append(p)
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL or i == total:
+                print(f"  Hashed {i}/{total}", flush=True)
+                last_report = now
 
     # Prepare manifest
     ts = time.strftime("%Y%m%d-%H%M%S")
     manifest = Path(f"duplicate-removals-{ts}.txt")
     removed_count = 0
-    groups_with_dupes = 0
 
+    # Keep lexicographically first path of each group; delete the rest
+    groups = []
+    for digest, paths in sorted(digest_map.items()):
+        if len(paths) <= 1:
+            continue
+        paths_sorted = sorted(paths)
+        groups.append((digest, paths_sorted[0], paths_sorted[1:]))
+    groups_with_dupes = len(groups)
+    errors = remove_files([dup for _, _, dupes in groups for dup in dupes])
+
+    lines = [
+        f"Duplicate removal manifest (exact {digest_name()} matches)\n",
+        time.strftime("Generated: %Y-%m-%d %H:%M:%S") + "\n\n",
+    ]
+    for digest, keep, dupes in groups:
+        lines.append(f"Digest: {digest}\n")
+        lines.append(f"  KEEP: {keep}\n")
+        for dup in dupes:
+            err = errors[dup]
+            if err is None:
+                removed_count += 1
+                lines.append(f"  DEL : {dup}\n")
+            else:
+                lines.append(f"  FAIL: {dup} ({err})\n")
+        lines.append("\n")
     with manifest.open("w", encoding="utf-8") as mf:
-        mf.write("Duplicate removal manifest (exact SHA-256 matches)\n")
-        mf.write(time.strftime("Generated: %Y-%m-%d %H:%M:%S") + "\n\n")
-        for digest, paths in sorted(digest_map.items()):
-            if len(paths) <= 1:
-                continue
-            groups_with_dupes += 1
-            # Keep lexicographically first path; delete the rest
-            paths_sorted = sorted(paths, key=lambda p: str(p))
-            keep = paths_sorted[0]
-            dupes = paths_sorted[1:]
-            mf.write(f"Digest: {digest}\n")
-            mf.write(f"  KEEP: {keep}\n")
-            for dup in dupes:
-                try:
-                    os.remove(dup)
-                    removed_count += 1
-                    mf.write(f"  DEL : {dup}\n")
-                except Exception as e:
-                    mf.write(f"  FAIL: {dup} ({e})\n")
-            mf.write("\n")
+        mf.write("".join(lines))
 
     print(f"Groups with duplicates: {groups_with_dupes}")
     print(f"Deleted duplicate files: {removed_count}")